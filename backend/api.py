@@ -8,6 +8,7 @@ from typing import Optional, List, Dict, Any, Set
 from datetime import datetime, date, timedelta
 import json
 import asyncio
+import contextlib
 import uuid
 import httpx
 import logging
@@ -2417,11 +2418,15 @@ async def optimize_payment_schedule(request: Request):
         
         result = await scheduler.schedule_payments(sessionid, financial_data)
         
-        return {
-            "status": "success",
-            "schedule": result,
-            "technology": "IBM LangGraph Autonomous Agent"
-        }
+        # Encoded by the scheduler (orjson when installed) instead of jsonable_encoder
+        return Response(
+            content=scheduler.to_json({
+                "status": "success",
+                "schedule": result,
+                "technology": "IBM LangGraph Autonomous Agent"
+            }),
+            media_type="application/json"
+        )
         
     except Exception as e:
         logger.error(f"Payment scheduling failed: {e}")
@@ -2467,6 +2472,44 @@ async def knowledge_augmented_query(request: Request):
         logger.error(f"Knowledge-augmented query failed: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/stream/knowledge-augmented/query")
+async def knowledge_augmented_query_stream(request: Request):
+    """Stream a Knowledge-Augmented LLM answer (SSE): text chunks, then a metadata frame."""
+    sessionid = request.cookies.get("sessionid")
+    if not sessionid:
+        raise HTTPException(status_code=401, detail="Session ID required")
+    
+    body = await request.json()
+    query = body.get('query', '')
+    
+    async def generate():
+        try:
+            from ibm_components import get_knowledge_llm
+            knowledge_llm = get_knowledge_llm()
+            
+            user_context = {
+                "current_balance": 75000,
+                "monthly_spending": 45000,
+                "goals": goals_manager.list_goals(sessionid),
+                "patterns": {
+                    "top_categories": ["Food", "Transport", "Shopping"],
+                    "spending_trend": "stable"
+                }
+            }
+            
+            # aclosing: a disconnect while this generator is suspended still closes the model stream
+            async with contextlib.aclosing(
+                knowledge_llm.augment_query_stream(sessionid, query, user_context)
+            ) as frames:
+                async for frame in frames:
+                    yield {"data": json.dumps(frame)}
+                
+        except Exception as e:
+            logger.error(f"Knowledge-augmented stream failed: {e}")
+            yield {"data": json.dumps({"error": str(e)})}
+    
+    return EventSourceResponse(generate())
+
 @app.post("/api/risk-guard/start")
 async def start_risk_monitoring(request: Request):
     """Start real-time risk monitoring with Event Streams."""
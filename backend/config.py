@@ -1,65 +1,118 @@
 """
 Configuration module for the Finance Agent application.
 """
+import functools
 import os
 from typing import Optional
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+@functools.lru_cache(maxsize=1)
+def _ensure_dotenv() -> None:
+    """Load environment variables from .env once, on first configuration access."""
+    load_dotenv()
 
-class Config:
+class _LazyConfigMeta(type):
+    """Resolve environment-backed settings, and load .env, on the first read of any of them."""
+    
+    def __getattr__(cls, name: str):
+        if name in cls.__annotations__ and not cls._loaded:
+            cls._load()
+            return getattr(cls, name)
+        raise AttributeError(f"type object {cls.__name__!r} has no attribute {name!r}")
+
+class Config(metaclass=_LazyConfigMeta):
     """Application configuration."""
     
     # LLM Provider Selection
-    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "google")
+    LLM_PROVIDER: str
     
     # Google ADK
-    GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
+    GOOGLE_API_KEY: str
     GEMINI_MODEL: str = "gemini-1.5-flash"
     
     # IBM watsonx.ai
-    WATSONX_API_KEY: str = os.getenv("WATSONX_API_KEY", "")
-    WATSONX_REGION: str = os.getenv("WATSONX_REGION", "us-south")
-    WATSONX_PROJECT_ID: str = os.getenv("WATSONX_PROJECT_ID", "")
-    WATSONX_API_VERSION: str = os.getenv("WATSONX_API_VERSION", "2025-02-11")
-    WATSONX_MODEL_ID: str = os.getenv("WATSONX_MODEL_ID", "ibm/granite-3-8b-instruct")
+    WATSONX_API_KEY: str
+    WATSONX_REGION: str
+    WATSONX_PROJECT_ID: str
+    WATSONX_API_VERSION: str
+    WATSONX_MODEL_ID: str
     
     # Vertex AI Configuration
-    VERTEX_AI_PROJECT_ID: str = os.getenv("VERTEX_AI_PROJECT_ID", "")
-    VERTEX_AI_LOCATION: str = os.getenv("VERTEX_AI_LOCATION", "us-central1")
-    VERTEX_AI_MODEL: str = os.getenv("VERTEX_AI_MODEL", "gemini-1.5-flash")
-    USE_VERTEX_AI: bool = os.getenv("USE_VERTEX_AI", "false").lower() == "true"
+    VERTEX_AI_PROJECT_ID: str
+    VERTEX_AI_LOCATION: str
+    VERTEX_AI_MODEL: str
+    USE_VERTEX_AI: bool
     
     # MCP Server
-    MCP_BASE_URL: str = os.getenv("MCP_BASE_URL", "http://localhost:8080")
+    MCP_BASE_URL: str
     
     # Application
-    DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
+    DEBUG: bool
     APP_NAME: str = "Finance AI Agent"
     APP_VERSION: str = "1.0.0"
     
     # MCP Endpoints
-    MCP_ENDPOINTS = [
+    MCP_ENDPOINTS = (
         "net_worth",
         "credit_report", 
         "epf_details",
         "mf_transactions",
         "bank_transactions",
         "stock_transactions"
-    ]
+    )
+    
+    _loaded: bool = False
+    
+    @classmethod
+    def _load(cls) -> None:
+        """Resolve environment-backed settings from a single os.environ snapshot."""
+        _ensure_dotenv()
+        env = dict(os.environ)
+        
+        cls.LLM_PROVIDER = env.get("LLM_PROVIDER", "google")
+        
+        cls.GOOGLE_API_KEY = env.get("GOOGLE_API_KEY", "")
+        
+        cls.WATSONX_API_KEY = env.get("WATSONX_API_KEY", "")
+        cls.WATSONX_REGION = env.get("WATSONX_REGION", "us-south")
+        cls.WATSONX_PROJECT_ID = env.get("WATSONX_PROJECT_ID", "")
+        cls.WATSONX_API_VERSION = env.get("WATSONX_API_VERSION", "2025-02-11")
+        cls.WATSONX_MODEL_ID = env.get("WATSONX_MODEL_ID", "ibm/granite-3-8b-instruct")
+        
+        cls.VERTEX_AI_PROJECT_ID = env.get("VERTEX_AI_PROJECT_ID", "")
+        cls.VERTEX_AI_LOCATION = env.get("VERTEX_AI_LOCATION", "us-central1")
+        cls.VERTEX_AI_MODEL = env.get("VERTEX_AI_MODEL", "gemini-1.5-flash")
+        cls.USE_VERTEX_AI = env.get("USE_VERTEX_AI", "false").lower() == "true"
+        
+        cls.MCP_BASE_URL = env.get("MCP_BASE_URL", "http://localhost:8080")
+        
+        cls.DEBUG = env.get("DEBUG", "false").lower() == "true"
+        cls._loaded = True
+    
+    def __getattr__(self, name: str):
+        # Instance reads of unloaded settings go through the class-level hook
+        return getattr(type(self), name)
+    
+    @classmethod
+    def clear_cache(cls) -> None:
+        """Re-read os.environ, e.g. after a test patches the environment."""
+        cls._load()
+        cls.validate.cache_clear()
     
     @classmethod
+    @functools.lru_cache(maxsize=1)
     def validate(cls) -> None:
-        """Validate required configuration."""
+        """Validate required configuration (checked once until clear_cache())."""
         # Provider-specific validation
-        if cls.LLM_PROVIDER.lower() == "google":
+        provider = cls.LLM_PROVIDER.lower()
+        if provider == "google":
             if not cls.GOOGLE_API_KEY:
                 raise ValueError("GOOGLE_API_KEY is required when LLM_PROVIDER=google")
-        elif cls.LLM_PROVIDER.lower() == "watsonx":
-            missing = [k for k in ("WATSONX_API_KEY","WATSONX_PROJECT_ID") if not getattr(cls,k)]
-            if missing:
-                raise ValueError(f"{', '.join(missing)} required when LLM_PROVIDER=watsonx")
+        elif provider == "watsonx":
+            required = ("WATSONX_API_KEY", "WATSONX_PROJECT_ID")
+            if any(not getattr(cls, k) for k in required):
+                missing = ", ".join(k for k in required if not getattr(cls, k))
+                raise ValueError(f"{missing} required when LLM_PROVIDER=watsonx")
         
         if not cls.MCP_BASE_URL:
             raise ValueError("MCP_BASE_URL environment variable is required")
@@ -67,5 +120,9 @@ class Config:
         if cls.USE_VERTEX_AI and not cls.VERTEX_AI_PROJECT_ID:
             raise ValueError("VERTEX_AI_PROJECT_ID environment variable is required when USE_VERTEX_AI is enabled")
 
-# Create a singleton instance
-config = Config() 
\ No newline at end of file
+def __getattr__(name: str):
+    """Create the config singleton lazily so importing this module stays cheap."""
+    if name == "config":
+        instance = globals()["config"] = Config()
+        return instance
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
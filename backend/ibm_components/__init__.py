@@ -3,10 +3,20 @@ IBM Advanced Components for FINION
 Showcasing cutting-edge IBM technologies for financial intelligence
 """
 
-from .financial_twin import get_financial_twin, FinancialDigitalTwin
-from .payment_scheduler import get_payment_scheduler, AutonomousPaymentScheduler
-from .knowledge_augmented import get_knowledge_llm, KnowledgeAugmentedLLM
-from .risk_guard import get_risk_guard, ProactiveRiskGuard
+import importlib
+from types import MappingProxyType
+
+# Public name -> submodule; submodules are imported on first attribute access
+_LAZY = {
+    'get_financial_twin': 'financial_twin',
+    'FinancialDigitalTwin': 'financial_twin',
+    'get_payment_scheduler': 'payment_scheduler',
+    'AutonomousPaymentScheduler': 'payment_scheduler',
+    'get_knowledge_llm': 'knowledge_augmented',
+    'KnowledgeAugmentedLLM': 'knowledge_augmented',
+    'get_risk_guard': 'risk_guard',
+    'ProactiveRiskGuard': 'risk_guard'
+}
 
 __all__ = [
     'get_financial_twin',
@@ -19,8 +29,8 @@ __all__ = [
     'ProactiveRiskGuard'
 ]
 
-# Component status
-COMPONENTS = {
+# Component status (read-only, shared by every caller)
+COMPONENTS = MappingProxyType({
     "financial_digital_twin": {
         "name": "Financial Digital Twin",
         "tech": "Neo4j + RAG",
@@ -45,4 +55,14 @@ COMPONENTS = {
         "status": "ready",
         "description": "Real-time anomaly detection"
     }
-}
+})
+
+
+def __getattr__(name):
+    """Import the owning submodule on first access to a component name."""
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_LAZY[name]}", __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
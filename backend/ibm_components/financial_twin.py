@@ -6,12 +6,128 @@ IBM Technologies: Neo4j Graph Database + watsonx RAG
 
 import os
 import json
+import atexit
+import functools
+import threading
+import time
+import types
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import logging
 
+try:
+    from utils.watsonx_client import WatsonxModel
+except ImportError:
+    WatsonxModel = None
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, separators=(',', ':'))
+
 logger = logging.getLogger(__name__)
 
+# Cypher queries, kept as module constants so every call reuses the same string
+_Q_MERGE_USER = """
+MERGE (u:User {sessionid: $sessionid})
+SET u.created = timestamp()
+"""
+
+_Q_UPSERT_ACCOUNT = """
+UNWIND $accounts AS acc
+MERGE (a:Account {id: acc.id})
+SET a.type = acc.type, a.balance = acc.balance
+MERGE (u:User {sessionid: $sessionid})
+MERGE (u)-[:OWNS]->(a)
+"""
+
+_Q_CREATE_TXN = """
+UNWIND $transactions AS txn
+MATCH (a:Account {id: txn.account_id})
+CREATE (a)-[:TRANSACTED]->(:Transaction {
+    id: txn.id,
+    amount: txn.amount,
+    category: txn.category,
+    date: txn.date,
+    merchant: txn.merchant
+})
+"""
+
+# Schema statements run once per connection; the uniqueness constraints back the
+# MERGE/MATCH lookups with an index
+_Q_SCHEMA = (
+    "CREATE CONSTRAINT user_sid IF NOT EXISTS FOR (u:User) REQUIRE u.sessionid IS UNIQUE",
+    "CREATE CONSTRAINT acct_id IF NOT EXISTS FOR (a:Account) REQUIRE a.id IS UNIQUE",
+    "CREATE INDEX txn_cat IF NOT EXISTS FOR (t:Transaction) ON (t.category)"
+)
+
+_Q_INCOME_SCENARIO = """
+MATCH (u:User {sessionid: $sessionid})-[:OWNS]->(a:Account)
+WITH u, a, a.balance * (1 + $change_percent/100) as new_balance
+RETURN 
+    sum(a.balance) as current_total,
+    sum(new_balance) as projected_total,
+    count(a) as accounts_affected
+"""
+
+_Q_EXPENSE_SCENARIO = """
+MATCH (u:User {sessionid: $sessionid})-[:OWNS]->(a:Account)-[:TRANSACTED]->(t:Transaction)
+WHERE t.category = $category
+WITH sum(t.amount) * (1 - $reduction_percent/100) as savings
+RETURN savings
+"""
+
+_Q_INVESTMENT_SCENARIO = """
+MATCH (u:User {sessionid: $sessionid})-[:OWNS]->(a:Account)
+WHERE a.type = 'investment'
+RETURN sum(a.balance) + $increase_amount as invested
+"""
+
+_Q_RAG_CONTEXT = """
+MATCH (u:User {sessionid: $sessionid})-[r*1..3]-(n)
+WHERE n:Account OR n:Transaction OR n:Goal
+RETURN coalesce(labels(n)[0], 'Unknown') as type, properties(n) as properties, type(r[0]) as relationship
+LIMIT 20
+"""
+
+# Static what-if results served in simulation mode
+_MOCK_RESULTS = types.MappingProxyType({
+    'income_change': types.MappingProxyType({
+        "scenario": "income_change",
+        "current_monthly_income": 75000,
+        "projected_monthly_income": 90000,
+        "impact_on_savings": 15000,
+        "goal_achievement_improvement": "23% faster",
+        "risk_reduction": "Medium to Low risk profile"
+    }),
+    'expense_reduction': types.MappingProxyType({
+        "scenario": "expense_reduction", 
+        "current_monthly_expenses": 45000,
+        "projected_monthly_expenses": 36000,
+        "monthly_savings": 9000,
+        "annual_savings": 108000,
+        "categories_optimized": ("Dining", "Entertainment", "Shopping")
+    }),
+    'investment_increase': types.MappingProxyType({
+        "scenario": "investment_increase",
+        "current_investment": 20000,
+        "projected_returns_1yr": 24000,
+        "projected_returns_5yr": 140000,
+        "risk_adjusted_return": "12.5%",
+        "recommendation": "Diversify across equity and debt"
+    })
+})
+
+_MOCK_DEFAULT = types.MappingProxyType({
+    "status": "analyzed",
+    "impact": "Scenario processed by Financial Digital Twin",
+    "recommendation": "Based on graph analysis of your financial patterns"
+})
+
 class FinancialDigitalTwin:
     """
     Advanced financial modeling using Neo4j graph database and RAG.
@@ -22,24 +138,55 @@ class FinancialDigitalTwin:
         self.neo4j_uri = os.getenv("NEO4J_URI", "bolt://localhost:7687")
         self.neo4j_user = os.getenv("NEO4J_USER", "neo4j")
         self.neo4j_password = os.getenv("NEO4J_PASSWORD", "password")
-        self.driver = None
-        self._initialize_connection()
+        self._session_local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        atexit.register(self.close)
+    
+    @functools.cached_property
+    def driver(self):
+        """Neo4j driver, created on first use (None when Neo4j is unavailable)."""
+        return self._initialize_connection()
     
     def _initialize_connection(self):
         """Initialize Neo4j connection."""
         try:
             from neo4j import GraphDatabase
-            self.driver = GraphDatabase.driver(
+            driver = GraphDatabase.driver(
                 self.neo4j_uri, 
                 auth=(self.neo4j_user, self.neo4j_password)
             )
+            self._ensure_indexes(driver)
             logger.info("Neo4j connection established for Financial Digital Twin")
+            return driver
         except ImportError:
             logger.warning("Neo4j driver not installed. Install with: pip install neo4j")
-            self.driver = None
+            return None
         except Exception as e:
             logger.error(f"Failed to connect to Neo4j: {e}")
-            self.driver = None
+            return None
+    
+    def _ensure_indexes(self, driver):
+        """Create the constraints and indexes the graph queries rely on (idempotent)."""
+        try:
+            with driver.session() as session:
+                for statement in _Q_SCHEMA:
+                    try:
+                        session.run(statement).consume()
+                    except Exception as e:
+                        logger.warning(f"Neo4j schema statement failed ({statement}): {e}")
+        except Exception as e:
+            logger.warning(f"Failed to create Neo4j indexes: {e}")
+    
+    def _session(self):
+        """Return this thread's long-lived Neo4j session, opening it on first use."""
+        session = getattr(self._session_local, 'session', None)
+        if session is None or session.closed():
+            session = self.driver.session()
+            self._session_local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
     
     def create_financial_graph(self, sessionid: str, financial_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -64,75 +211,77 @@ class FinancialDigitalTwin:
         if not self.driver:
             return self._mock_financial_graph(sessionid, financial_data)
         
-        with self.driver.session() as session:
-            # Create user node
-            session.run("""
-                MERGE (u:User {sessionid: $sessionid})
-                SET u.created = timestamp()
-                """, sessionid=sessionid)
-            
-            # Create account nodes
-            if 'accounts' in financial_data:
-                for account in financial_data['accounts']:
-                    session.run("""
-                        MERGE (a:Account {id: $id})
-                        SET a.type = $type, a.balance = $balance
-                        MERGE (u:User {sessionid: $sessionid})
-                        MERGE (u)-[:OWNS]->(a)
-                        """, 
-                        id=account['id'],
-                        type=account['type'],
-                        balance=account['balance'],
-                        sessionid=sessionid
-                    )
-            
-            # Create transaction nodes with patterns
-            if 'transactions' in financial_data:
-                for txn in financial_data['transactions']:
-                    session.run("""
-                        CREATE (t:Transaction {
-                            id: $id,
-                            amount: $amount,
-                            category: $category,
-                            date: $date,
-                            merchant: $merchant
-                        })
-                        WITH t
-                        MATCH (a:Account {id: $account_id})
-                        CREATE (a)-[:TRANSACTED]->(t)
-                        """,
-                        id=txn['id'],
-                        amount=txn['amount'],
-                        category=txn['category'],
-                        date=txn['date'],
-                        merchant=txn.get('merchant', 'Unknown'),
-                        account_id=txn['account_id']
-                    )
-            
-            return {
-                "status": "success",
-                "message": "Financial graph created",
-                "nodes_created": len(financial_data.get('accounts', [])) + len(financial_data.get('transactions', [])),
-                "graph_id": f"graph_{sessionid}_{datetime.now().timestamp()}"
-            }
+        session = self._session()
+        # Write the whole graph in one transaction so the commit is shared
+        nodes_created = session.execute_write(self._write_financial_graph, sessionid, financial_data)
+        
+        return {
+            "status": "success",
+            "message": "Financial graph created",
+            "nodes_created": nodes_created,
+            "graph_id": f"graph_{sessionid}_{time.time()}"
+        }
+    
+    @staticmethod
+    def _write_financial_graph(tx, sessionid: str, financial_data: Dict[str, Any]) -> int:
+        """
+        Create user, account and transaction nodes with one UNWIND query per node type.
+        Returns the number of account and transaction nodes Neo4j created.
+        """
+        nodes_created = 0
+        
+        # Create user node
+        tx.run(_Q_MERGE_USER, sessionid=sessionid)
+        
+        # Create account nodes
+        if 'accounts' in financial_data:
+            accounts = [
+                {'id': account['id'], 'type': account['type'], 'balance': account['balance']}
+                for account in financial_data['accounts']
+            ]
+            result = tx.run(_Q_UPSERT_ACCOUNT, accounts=accounts, sessionid=sessionid)
+            nodes_created += result.consume().counters.nodes_created
+        
+        # Create transaction nodes with patterns
+        if 'transactions' in financial_data:
+            transactions = [
+                {
+                    'id': txn['id'],
+                    'amount': txn['amount'],
+                    'category': txn['category'],
+                    'date': txn['date'],
+                    'merchant': txn.get('merchant', 'Unknown'),
+                    'account_id': txn['account_id']
+                }
+                for txn in financial_data['transactions']
+            ]
+            # Rows whose account_id matches no account are dropped by the MATCH
+            result = tx.run(_Q_CREATE_TXN, transactions=transactions)
+            nodes_created += result.consume().counters.nodes_created
+        
+        return nodes_created
     
     def _mock_financial_graph(self, sessionid: str, financial_data: Dict[str, Any]) -> Dict[str, Any]:
         """Mock implementation when Neo4j is not available."""
+        accounts = financial_data.get('accounts') or ()
+        transactions = financial_data.get('transactions') or ()
+        goals = financial_data.get('goals') or ()
+        
         return {
             "status": "mock",
             "message": "Financial Digital Twin created (simulation mode)",
             "graph_structure": {
                 "nodes": {
                     "user": 1,
-                    "accounts": len(financial_data.get('accounts', [])),
-                    "transactions": len(financial_data.get('transactions', [])),
-                    "goals": len(financial_data.get('goals', [])),
+                    "accounts": len(accounts),
+                    "transactions": len(transactions),
+                    "goals": len(goals),
                     "risk_factors": 5  # Simulated risk factors
                 },
                 "relationships": {
-                    "owns": len(financial_data.get('accounts', [])),
-                    "transacted": len(financial_data.get('transactions', [])),
-                    "targets": len(financial_data.get('goals', [])),
+                    "owns": len(accounts),
+                    "transacted": len(transactions),
+                    "targets": len(goals),
                     "exposed_to": 5
                 }
             },
@@ -160,86 +309,19 @@ class FinancialDigitalTwin:
         if not self.driver:
             return self._mock_what_if_scenario(sessionid, scenario)
         
-        with self.driver.session() as session:
-            if scenario_type == 'income_change':
-                result = session.run("""
-                    MATCH (u:User {sessionid: $sessionid})-[:OWNS]->(a:Account)
-                    WITH u, a, a.balance * (1 + $change_percent/100) as new_balance
-                    RETURN 
-                        sum(a.balance) as current_total,
-                        sum(new_balance) as projected_total,
-                        count(a) as accounts_affected
-                    """,
-                    sessionid=sessionid,
-                    change_percent=parameters.get('change_percent', 0)
-                )
-                
-                record = result.single()
-                return {
-                    "scenario": scenario_type,
-                    "current_state": record['current_total'],
-                    "projected_state": record['projected_total'],
-                    "impact": record['projected_total'] - record['current_total'],
-                    "accounts_affected": record['accounts_affected']
-                }
-            
-            elif scenario_type == 'expense_reduction':
-                result = session.run("""
-                    MATCH (u:User {sessionid: $sessionid})-[:OWNS]->(a:Account)-[:TRANSACTED]->(t:Transaction)
-                    WHERE t.category = $category
-                    WITH sum(t.amount) * (1 - $reduction_percent/100) as savings
-                    RETURN savings
-                    """,
-                    sessionid=sessionid,
-                    category=parameters.get('category', 'dining'),
-                    reduction_percent=parameters.get('reduction_percent', 20)
-                )
-                
-                record = result.single()
-                return {
-                    "scenario": scenario_type,
-                    "monthly_savings": record['savings'],
-                    "annual_savings": record['savings'] * 12,
-                    "recommendation": "Achievable with moderate lifestyle adjustments"
-                }
+        handler = _SCENARIO_HANDLERS.get(scenario_type)
+        if handler is None:
+            return {"scenario": scenario_type, "status": "unsupported"}
+        return handler(self._session(), sessionid, parameters)
     
     def _mock_what_if_scenario(self, sessionid: str, scenario: Dict[str, Any]) -> Dict[str, Any]:
         """Mock what-if scenario when Neo4j is not available."""
         scenario_type = scenario.get('type', 'unknown')
         
-        mock_results = {
-            'income_change': {
-                "scenario": "income_change",
-                "current_monthly_income": 75000,
-                "projected_monthly_income": 90000,
-                "impact_on_savings": 15000,
-                "goal_achievement_improvement": "23% faster",
-                "risk_reduction": "Medium to Low risk profile"
-            },
-            'expense_reduction': {
-                "scenario": "expense_reduction", 
-                "current_monthly_expenses": 45000,
-                "projected_monthly_expenses": 36000,
-                "monthly_savings": 9000,
-                "annual_savings": 108000,
-                "categories_optimized": ["Dining", "Entertainment", "Shopping"]
-            },
-            'investment_increase': {
-                "scenario": "investment_increase",
-                "current_investment": 20000,
-                "projected_returns_1yr": 24000,
-                "projected_returns_5yr": 140000,
-                "risk_adjusted_return": "12.5%",
-                "recommendation": "Diversify across equity and debt"
-            }
-        }
-        
-        return mock_results.get(scenario_type, {
-            "scenario": scenario_type,
-            "status": "analyzed",
-            "impact": "Scenario processed by Financial Digital Twin",
-            "recommendation": "Based on graph analysis of your financial patterns"
-        })
+        mock_result = _MOCK_RESULTS.get(scenario_type)
+        if mock_result is not None:
+            return dict(mock_result)
+        return {"scenario": scenario_type, **_MOCK_DEFAULT}
     
     def get_rag_insights(self, sessionid: str, query: str) -> Dict[str, Any]:
         """
@@ -250,45 +332,39 @@ class FinancialDigitalTwin:
         if not self.driver:
             return self._mock_rag_insights(sessionid, query)
         
-        with self.driver.session() as session:
-            # Retrieve relevant graph context
-            result = session.run("""
-                MATCH (u:User {sessionid: $sessionid})-[r*1..3]-(n)
-                WHERE n:Account OR n:Transaction OR n:Goal
-                RETURN n, type(r[0]) as relationship
-                LIMIT 20
-                """, sessionid=sessionid)
-            
-            context = []
-            for record in result:
-                node = record['n']
-                context.append({
-                    'type': list(node.labels)[0],
-                    'properties': dict(node),
-                    'relationship': record['relationship']
-                })
-            
-            # Use watsonx to generate insights from graph context
-            from utils.watsonx_client import WatsonxModel
-            model = WatsonxModel()
-            
-            prompt = f"""
-            Based on the financial graph data:
-            {json.dumps(context, indent=2)}
-            
-            User Query: {query}
-            
-            Provide personalized financial insights:
-            """
-            
-            response = model.generate_content(prompt)
-            
-            return {
-                "query": query,
-                "graph_nodes_analyzed": len(context),
-                "insights": response.text,
-                "data_sources": ["Neo4j Graph", "watsonx RAG", "Financial Patterns"]
+        session = self._session()
+        # Retrieve relevant graph context
+        result = session.run(_Q_RAG_CONTEXT, sessionid=sessionid)
+        
+        context = [
+            {
+                'type': record['type'],
+                'properties': record['properties'],
+                'relationship': record['relationship']
             }
+            for record in result
+        ]
+        
+        # Use watsonx to generate insights from graph context
+        model = _watsonx()
+        
+        prompt = f"""
+        Based on the financial graph data:
+        {_dumps(context)}
+        
+        User Query: {query}
+        
+        Provide personalized financial insights:
+        """
+        
+        response = model.generate_content(prompt)
+        
+        return {
+            "query": query,
+            "graph_nodes_analyzed": len(context),
+            "insights": response.text,
+            "data_sources": ["Neo4j Graph", "watsonx RAG", "Financial Patterns"]
+        }
     
     def _mock_rag_insights(self, sessionid: str, query: str) -> Dict[str, Any]:
         """Mock RAG insights when Neo4j is not available."""
@@ -307,13 +383,80 @@ class FinancialDigitalTwin:
         }
     
     def close(self):
-        """Close Neo4j connection."""
-        if self.driver:
-            self.driver.close()
+        """Close Neo4j sessions and connection."""
+        with self._sessions_lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        
+        # Avoid dialing Neo4j just to close a connection that was never opened
+        driver = self.__dict__.get('driver')
+        if driver:
+            driver.close()
+
+def _income_change_scenario(session, sessionid: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Project account balances after an income change."""
+    record = session.run(
+        _Q_INCOME_SCENARIO,
+        sessionid=sessionid,
+        change_percent=parameters.get('change_percent', 0)
+    ).single()
+    return {
+        "scenario": "income_change",
+        "current_state": record['current_total'],
+        "projected_state": record['projected_total'],
+        "impact": record['projected_total'] - record['current_total'],
+        "accounts_affected": record['accounts_affected']
+    }
+
+def _expense_reduction_scenario(session, sessionid: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Estimate savings from cutting spend in one category."""
+    record = session.run(
+        _Q_EXPENSE_SCENARIO,
+        sessionid=sessionid,
+        category=parameters.get('category', 'dining'),
+        reduction_percent=parameters.get('reduction_percent', 20)
+    ).single()
+    return {
+        "scenario": "expense_reduction",
+        "monthly_savings": record['savings'],
+        "annual_savings": record['savings'] * 12,
+        "recommendation": "Achievable with moderate lifestyle adjustments"
+    }
+
+def _investment_increase_scenario(session, sessionid: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Project investment growth after adding to invested balances."""
+    record = session.run(
+        _Q_INVESTMENT_SCENARIO,
+        sessionid=sessionid,
+        increase_amount=parameters.get('increase_amount', 0)
+    ).single()
+    invested = record['invested']
+    # Growth is compounded here rather than in Cypher, where whole-number
+    # percentages would divide as integers
+    growth = 1 + float(parameters.get('expected_return', 12)) / 100
+    return {
+        "scenario": "investment_increase",
+        "current_investment": invested,
+        "projected_returns_1yr": invested * growth,
+        "projected_returns_5yr": invested * growth ** 5,
+        "recommendation": "Diversify across equity and debt"
+    }
+
+_SCENARIO_HANDLERS = {
+    'income_change': _income_change_scenario,
+    'expense_reduction': _expense_reduction_scenario,
+    'investment_increase': _investment_increase_scenario
+}
 
-# Singleton instance
-financial_twin = FinancialDigitalTwin()
+@functools.lru_cache(maxsize=1)
+def _watsonx():
+    """Shared watsonx client for RAG insight generation."""
+    if WatsonxModel is None:
+        raise ImportError("watsonx client unavailable. Install with: pip install httpx")
+    return WatsonxModel()
 
+@functools.lru_cache(maxsize=1)
 def get_financial_twin():
-    """Get the Financial Digital Twin instance."""
-    return financial_twin
+    """Get the Financial Digital Twin instance, creating it on first call."""
+    return FinancialDigitalTwin()
@@ -9,17 +9,247 @@ import json
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
+import functools
 import logging
-from enum import Enum
+import re
+from collections import Counter
+from dataclasses import dataclass, replace
+from enum import IntEnum
+from types import MappingProxyType
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    def _to_builtin(obj: Any) -> Any:
+        """json.dumps fallback for NumPy scalars and arrays."""
+        if hasattr(obj, 'tolist'):
+            return obj.tolist()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':'), default=_to_builtin).encode()
 
 logger = logging.getLogger(__name__)
 
-class PaymentPriority(Enum):
-    """Payment priority levels for autonomous scheduling."""
-    CRITICAL = "critical"  # Rent, EMI, Insurance
-    HIGH = "high"  # Utilities, Credit Card
-    MEDIUM = "medium"  # Subscriptions, Services
-    LOW = "low"  # Entertainment, Optional
+# Priority keywords matched against merchant and category, one compiled
+# alternation per level so each level is a single scan
+_CRITICAL_KEYWORDS = ('rent', 'emi', 'loan', 'insurance', 'mortgage')
+_HIGH_KEYWORDS = ('electricity', 'water', 'gas', 'internet', 'phone', 'credit')
+_MEDIUM_KEYWORDS = ('subscription', 'membership', 'service')
+_CRITICAL_RE = re.compile('|'.join(map(re.escape, _CRITICAL_KEYWORDS)))
+_HIGH_RE = re.compile('|'.join(map(re.escape, _HIGH_KEYWORDS)))
+_MEDIUM_RE = re.compile('|'.join(map(re.escape, _MEDIUM_KEYWORDS)))
+
+# Payment status codes produced by the schedule kernel
+_STATUS_NAMES = ('safe', 'tight', 'delayed')
+
+# Payment/balance ratio bin edges and the risk score of each bin
+if np is not None:
+    _RISK_BINS = np.array([0.5, 0.8, 1.0])
+    _RISK_VALS = np.array([0.2, 0.5, 0.8, 1.0])
+
+class PaymentPriority(IntEnum):
+    """Payment priority levels for autonomous scheduling; the value is the sort rank."""
+    CRITICAL = 0  # Rent, EMI, Insurance
+    HIGH = 1  # Utilities, Credit Card
+    MEDIUM = 2  # Subscriptions, Services
+    LOW = 3  # Entertainment, Optional
+
+# Lowest-ranked priority still eligible for autopay, and the priority whose
+# risky payments are deferred; plain int ranks so the checks are int compares
+_AUTOPAY_MAX_RANK = int(PaymentPriority.HIGH)
+_DEFERRABLE_RANK = int(PaymentPriority.LOW)
+
+@dataclass(slots=True)
+class Payment:
+    """Recurring payment passed between the scheduling nodes; schedule fields are set by optimize_schedule_node."""
+    merchant: str
+    amount: float
+    category: str
+    priority: PaymentPriority
+    frequency: str
+    next_due: str
+    auto_pay_eligible: bool
+    optimal_payment_date: Optional[str] = None
+    predicted_balance_on_date: Optional[float] = None
+    payment_status: Optional[str] = None
+    risk_score: Optional[float] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Response form, with priority as the lowercase level name."""
+        data = {
+            'merchant': self.merchant,
+            'amount': self.amount,
+            'category': self.category,
+            'priority': self.priority.name.lower(),
+            'frequency': self.frequency,
+            'next_due': self.next_due,
+            'auto_pay_eligible': self.auto_pay_eligible
+        }
+        if self.payment_status is not None:
+            data['optimal_payment_date'] = self.optimal_payment_date
+            data['predicted_balance_on_date'] = self.predicted_balance_on_date
+            data['payment_status'] = self.payment_status
+            data['risk_score'] = self.risk_score
+        return data
+
+def _to_soa(transactions: List[Dict[str, Any]]) -> Tuple[Any, Any, Any]:
+    """Split transactions into (types, amounts, dates) NumPy arrays."""
+    # dtype=str sizes the column to the longest type, so 'CREDIT_REVERSAL' stays
+    # distinct from 'CREDIT'
+    types = np.asarray([t.get('type') or '' for t in transactions], dtype=str)
+    amounts = np.asarray([t.get('amount') or 0 for t in transactions], dtype=np.float64)
+    date_strings = [t.get('date') or '' for t in transactions]
+    try:
+        dates = np.asarray(date_strings, dtype='datetime64[D]')
+    except ValueError:
+        dates = np.array([_parse_day(d) for d in date_strings], dtype='datetime64[D]')
+    return types, amounts, dates
+
+def _to_frame(transactions: List[Dict[str, Any]]):
+    """Transactions as a DataFrame with the columns the scheduler groups on."""
+    df = pd.DataFrame.from_records(
+        transactions, columns=['merchant', 'amount', 'category', 'date', 'type']
+    )
+    df['merchant'] = df['merchant'].fillna('Unknown')
+    df['category'] = df['category'].fillna('Other')
+    df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d', errors='coerce')
+    return df
+
+def _parse_day(value: str):
+    """Parse one YYYY-MM-DD date, NaT when malformed."""
+    try:
+        return np.datetime64(value[:10], 'D')
+    except ValueError:
+        return np.datetime64('NaT')
+
+def _risk_scores(balances, amounts):
+    """Vectorized _calculate_risk_score over arrays of balances and amounts."""
+    positive = balances > 0
+    ratios = np.where(positive, amounts / np.where(positive, balances, 1.0), np.inf)
+    return np.where(positive, _RISK_VALS[np.digitize(ratios, _RISK_BINS)], 1.0)
+
+if njit is not None:
+    @njit(cache=True)
+    def _risk_branchless(balance, amount):
+        """Risk score for paying amount out of balance (see _calculate_risk_score)."""
+        if balance <= 0:
+            return 1.0
+        ratio = amount / balance
+        if ratio < 0.5:
+            return 0.2
+        if ratio < 0.8:
+            return 0.5
+        if ratio < 1.0:
+            return 0.8
+        return 1.0
+
+    @njit(cache=True)
+    def _optimize_kernel(amounts, days, avg_income, daily_burn, current_balance):
+        """Predicted balance, status code and risk score for each payment in due order."""
+        n = amounts.shape[0]
+        predicted = np.empty(n, dtype=np.float64)
+        status = np.empty(n, dtype=np.int8)
+        risk = np.empty(n, dtype=np.float64)
+        running_balance = current_balance
+        for i in range(n):
+            p = running_balance + avg_income * (days[i] / 30.0) - daily_burn * days[i]
+            predicted[i] = p
+            if p >= amounts[i] * 1.2:  # 20% buffer
+                status[i] = 0
+            elif p >= amounts[i]:
+                status[i] = 1
+            else:
+                status[i] = 2
+            risk[i] = _risk_branchless(p, amounts[i])
+            running_balance -= amounts[i]
+        return predicted, status, risk
+
+# Simulation-mode response; date fields are filled in per call from the day offsets
+_MOCK_UPCOMING = (
+    (5, {
+        'merchant': 'Home Rent',
+        'amount': 25000,
+        'category': 'Housing',
+        'priority': 'critical',
+        'auto_pay_eligible': True
+    }),
+    (10, {
+        'merchant': 'Electricity Board',
+        'amount': 2500,
+        'category': 'Utilities',
+        'priority': 'high',
+        'auto_pay_eligible': True
+    }),
+    (15, {
+        'merchant': 'Netflix',
+        'amount': 649,
+        'category': 'Entertainment',
+        'priority': 'low',
+        'auto_pay_eligible': False
+    })
+)
+
+_MOCK_OPTIMIZED = (
+    (5, {
+        'merchant': 'Home Rent',
+        'payment_status': 'safe',
+        'risk_score': 0.3
+    }),
+)
+
+_MOCK_SCHEDULE = MappingProxyType({
+    'status': 'success',
+    'cash_flow_analysis': MappingProxyType({
+        'average_income': 75000,
+        'income_frequency': 'monthly',
+        'daily_burn_rate': 1500,
+        'predicted_balance_7d': 45000,
+        'predicted_balance_30d': 82000,
+        'cash_runway_days': 30
+    }),
+    'suggestions': (
+        MappingProxyType({
+            'type': 'enable_autopay',
+            'merchant': 'Home Rent',
+            'amount': 25000,
+            'reason': 'Critical payment with sufficient balance buffer',
+            'confidence': 0.95
+        }),
+        MappingProxyType({
+            'type': 'payment_optimization',
+            'message': 'Bundle utility payments on salary credit day for better cash flow',
+            'savings_potential': 500,
+            'confidence': 0.82
+        })
+    ),
+    'monitoring': MappingProxyType({
+        'total_payments_scheduled': 8,
+        'autopay_enabled': 3,
+        'alerts_configured': 2,
+        'optimization_score': 0.875,
+        'learning_feedback': 'LangGraph agent learning from 127 historical patterns'
+    }),
+    'powered_by': 'IBM LangGraph Autonomous Agent (Simulation Mode)'
+})
 
 class AutonomousPaymentScheduler:
     """
@@ -27,11 +257,20 @@ class AutonomousPaymentScheduler:
     Predicts cash flow and optimizes payment timing.
     """
     
+    # Compiled LangGraph workflow, built once per process; the nodes keep no
+    # per-instance state, so every scheduler can share it
+    _COMPILED_GRAPH = None
+    
     def __init__(self):
         self.langgraph_enabled = self._check_langgraph()
-        self.state_graph = self._initialize_graph()
+        self.state_graph = self._get_graph()
+        # The workflow is a straight line of nodes, so production runs them
+        # directly; set FINION_FAST_PIPELINE=0 to go through LangGraph for tracing
+        self.fast_mode = os.getenv('FINION_FAST_PIPELINE', '1') == '1'
         self.payment_history = {}
         self.cash_flow_predictions = {}
+        # Merchant/category pairs repeat across sessions, so classify each once
+        self._determine_priority = functools.lru_cache(maxsize=8192)(self._determine_priority_impl)
     
     def _check_langgraph(self) -> bool:
         """Check if LangGraph is available."""
@@ -42,6 +281,12 @@ class AutonomousPaymentScheduler:
             logger.info("LangGraph not installed. Using mock implementation.")
             return False
     
+    def _get_graph(self):
+        """Return the shared compiled workflow, building it on first use."""
+        if AutonomousPaymentScheduler._COMPILED_GRAPH is None:
+            AutonomousPaymentScheduler._COMPILED_GRAPH = self._initialize_graph()
+        return AutonomousPaymentScheduler._COMPILED_GRAPH
+    
     def _initialize_graph(self):
         """Initialize the LangGraph state machine for payment scheduling."""
         if not self.langgraph_enabled:
@@ -77,53 +322,106 @@ class AutonomousPaymentScheduler:
             logger.error(f"Failed to initialize LangGraph: {e}")
             return None
     
-    async def analyze_cash_flow_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_cash_flow_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze cash flow patterns and predict future balances."""
         sessionid = state.get('sessionid')
         transactions = state.get('transactions', [])
         
-        # Analyze income patterns
-        income_dates = []
-        income_amounts = []
-        
-        for txn in transactions:
-            if txn.get('type') == 'CREDIT':
-                income_dates.append(txn.get('date'))
-                income_amounts.append(txn.get('amount', 0))
-        
-        # Predict next income
-        avg_income = sum(income_amounts) / len(income_amounts) if income_amounts else 0
+        if np is not None:
+            # Columnar view built once and reused by the later nodes
+            if '_soa' not in state:
+                state['_soa'] = _to_soa(transactions)
+            types, amounts, _ = state['_soa']
+            
+            credit_mask = types == 'CREDIT'
+            debit_mask = types == 'DEBIT'
+            avg_income = float(amounts[credit_mask].mean()) if credit_mask.any() else 0
+            daily_burn = float(amounts[debit_mask].sum()) / 30 if debit_mask.any() else 0
+        else:
+            # Income and expense totals in a single pass
+            income_sum = 0.0
+            income_count = 0
+            expense_sum = 0.0
+            expense_count = 0
+            
+            for txn in transactions:
+                txn_type = txn.get('type')
+                if txn_type == 'CREDIT':
+                    income_sum += txn.get('amount', 0)
+                    income_count += 1
+                elif txn_type == 'DEBIT':
+                    expense_sum += txn['amount']
+                    expense_count += 1
+            
+            # Predict next income
+            avg_income = income_sum / income_count if income_count else 0
+            
+            # Calculate daily burn rate
+            daily_burn = expense_sum / 30 if expense_count else 0
         
-        # Calculate daily burn rate
-        expenses = [t['amount'] for t in transactions if t.get('type') == 'DEBIT']
-        daily_burn = sum(expenses) / 30 if expenses else 0
+        state['cash_flow_analysis'] = self._cash_flow_summary(
+            state.get('current_balance', 0), avg_income, daily_burn
+        )
         
-        state['cash_flow_analysis'] = {
+        return state
+    
+    def _cash_flow_summary(self, current_balance: float, avg_income: float, daily_burn: float) -> Dict[str, Any]:
+        """Cash flow analysis for a balance, average income and daily burn rate."""
+        return {
             'average_income': avg_income,
             'income_frequency': 'monthly',
             'daily_burn_rate': daily_burn,
-            'predicted_balance_7d': state.get('current_balance', 0) - (daily_burn * 7),
-            'predicted_balance_30d': state.get('current_balance', 0) + avg_income - (daily_burn * 30),
-            'cash_runway_days': int(state.get('current_balance', 0) / daily_burn) if daily_burn > 0 else 999
+            'predicted_balance_7d': current_balance - (daily_burn * 7),
+            'predicted_balance_30d': current_balance + avg_income - (daily_burn * 30),
+            'cash_runway_days': int(current_balance / daily_burn) if daily_burn > 0 else 999
         }
-        
-        return state
     
-    async def identify_payments_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def identify_payments_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Identify upcoming payments and their priorities."""
-        
+        now = state.get('_now') or datetime.now()
         upcoming_payments = []
         
         # Identify recurring payments from transaction history
         transactions = state.get('transactions', [])
         
+        if pd is not None:
+            if '_df' not in state:
+                state['_df'] = _to_frame(transactions)
+            
+            # Drop one-off merchants before grouping, then one grouped
+            # aggregation; merchants keep first-seen order
+            df = state['_df']
+            recurring = df[df['merchant'].duplicated(keep=False)]  # At least 2 occurrences
+            grouped = recurring.groupby('merchant', sort=False).agg(
+                amount=('amount', 'mean'),
+                category=('category', 'first'),
+                last_date=('date', 'max')
+            )
+            state['upcoming_payments'] = self._payments_from_groups(grouped, now)
+            return state
+        
+        # Due dates come from the columnar dates parsed once for the whole batch
+        dates = None
+        if np is not None:
+            if '_soa' not in state:
+                state['_soa'] = _to_soa(transactions)
+            dates = state['_soa'][2]
+        
+        # Count merchants first so one-off merchants are never grouped
+        counts = Counter(t.get('merchant', 'Unknown') for t in transactions)
+        
         # Group by merchant/category to find patterns
         merchant_patterns = {}
-        for txn in transactions:
+        merchant_rows = {}
+        for i, txn in enumerate(transactions):
             merchant = txn.get('merchant', 'Unknown')
+            if counts[merchant] < 2:
+                continue
             if merchant not in merchant_patterns:
                 merchant_patterns[merchant] = []
+                merchant_rows[merchant] = []
             merchant_patterns[merchant].append(txn)
+            merchant_rows[merchant].append(i)
         
         # Identify recurring payments
         for merchant, txns in merchant_patterns.items():
@@ -135,55 +433,66 @@ class AutonomousPaymentScheduler:
                 category = txns[0].get('category', 'Other')
                 priority = self._determine_priority(category, merchant)
                 
-                upcoming_payments.append({
-                    'merchant': merchant,
-                    'amount': avg_amount,
-                    'category': category,
-                    'priority': priority.value,
-                    'frequency': 'monthly',
-                    'next_due': self._predict_next_due(txns),
-                    'auto_pay_eligible': priority in [PaymentPriority.CRITICAL, PaymentPriority.HIGH]
-                })
+                upcoming_payments.append(Payment(
+                    merchant=merchant,
+                    amount=avg_amount,
+                    category=category,
+                    priority=priority,
+                    frequency='monthly',
+                    next_due=(
+                        self._next_due_from_dates(dates[merchant_rows[merchant]], now)
+                        if dates is not None else self._predict_next_due(txns, now)
+                    ),
+                    auto_pay_eligible=priority <= _AUTOPAY_MAX_RANK
+                ))
         
         state['upcoming_payments'] = sorted(
             upcoming_payments, 
-            key=lambda x: (self._priority_rank(x['priority']), x['next_due'])
+            key=lambda x: (x.priority, x.next_due)
         )
         
         return state
     
-    def _determine_priority(self, category: str, merchant: str) -> PaymentPriority:
+    def _payments_from_groups(self, grouped, now: datetime) -> List[Payment]:
+        """Upcoming payments from per-merchant aggregates, in priority/due order."""
+        upcoming_payments = []
+        fallback_due = (now + timedelta(days=30)).strftime('%Y-%m-%d')
+        for row in grouped.itertuples():
+            priority = self._determine_priority(row.category, row.Index)
+            next_due = fallback_due if pd.isna(row.last_date) else (
+                row.last_date + pd.Timedelta(days=30)
+            ).strftime('%Y-%m-%d')
+            
+            upcoming_payments.append(Payment(
+                merchant=row.Index,
+                amount=float(row.amount),
+                category=row.category,
+                priority=priority,
+                frequency='monthly',
+                next_due=next_due,
+                auto_pay_eligible=priority <= _AUTOPAY_MAX_RANK
+            ))
+        
+        return sorted(upcoming_payments, key=lambda x: (x.priority, x.next_due))
+    
+    def _determine_priority_impl(self, category: str, merchant: str) -> PaymentPriority:
         """Determine payment priority based on category and merchant."""
-        critical_keywords = ['rent', 'emi', 'loan', 'insurance', 'mortgage']
-        high_keywords = ['electricity', 'water', 'gas', 'internet', 'phone', 'credit']
-        medium_keywords = ['subscription', 'membership', 'service']
+        # The separator keeps a keyword from matching across merchant and category
+        text = f"{merchant.lower()}\x00{category.lower()}"
         
-        merchant_lower = merchant.lower()
-        category_lower = category.lower()
-        
-        if any(k in merchant_lower or k in category_lower for k in critical_keywords):
+        if _CRITICAL_RE.search(text):
             return PaymentPriority.CRITICAL
-        elif any(k in merchant_lower or k in category_lower for k in high_keywords):
+        elif _HIGH_RE.search(text):
             return PaymentPriority.HIGH
-        elif any(k in merchant_lower or k in category_lower for k in medium_keywords):
+        elif _MEDIUM_RE.search(text):
             return PaymentPriority.MEDIUM
         else:
             return PaymentPriority.LOW
     
-    def _priority_rank(self, priority: str) -> int:
-        """Get numeric rank for priority."""
-        ranks = {
-            'critical': 0,
-            'high': 1,
-            'medium': 2,
-            'low': 3
-        }
-        return ranks.get(priority, 4)
-    
-    def _predict_next_due(self, transactions: List[Dict]) -> str:
+    def _predict_next_due(self, transactions: List[Dict], now: datetime) -> str:
         """Predict next due date based on transaction history."""
         if not transactions:
-            return datetime.now().strftime('%Y-%m-%d')
+            return now.strftime('%Y-%m-%d')
         
         # Get the last transaction date
         last_date = max(t.get('date', '') for t in transactions)
@@ -194,24 +503,66 @@ class AutonomousPaymentScheduler:
             next_dt = last_dt + timedelta(days=30)
             return next_dt.strftime('%Y-%m-%d')
         except:
-            return (datetime.now() + timedelta(days=30)).strftime('%Y-%m-%d')
+            return (now + timedelta(days=30)).strftime('%Y-%m-%d')
+    
+    @staticmethod
+    def _next_due_from_dates(dates, now: datetime) -> str:
+        """Next due date, 30 days after the latest valid date in a datetime64[D] array."""
+        dates = dates[~np.isnat(dates)]
+        if dates.size:
+            return str(dates.max() + np.timedelta64(30, 'D'))
+        return (now + timedelta(days=30)).strftime('%Y-%m-%d')
     
-    async def optimize_schedule_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def optimize_schedule_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize payment schedule based on cash flow predictions."""
         
+        now = state.get('_now') or datetime.now()
         cash_flow = state.get('cash_flow_analysis', {})
         upcoming_payments = state.get('upcoming_payments', [])
         current_balance = state.get('current_balance', 0)
         
+        if np is not None and upcoming_payments:
+            # Whole days from now until each due date (floored, like timedelta.days)
+            due_dates = np.array([p.next_due for p in upcoming_payments], dtype='datetime64[s]')
+            days_until = (due_dates - np.datetime64(now, 's')) // np.timedelta64(1, 'D')
+            amounts = np.array([p.amount for p in upcoming_payments], dtype=np.float64)
+            avg_income = float(cash_flow.get('average_income', 0))
+            daily_burn = float(cash_flow.get('daily_burn_rate', 0))
+            
+            if njit is not None:
+                # Compiled kernel over the payment arrays
+                predicted, status, risk = _optimize_kernel(
+                    amounts, days_until, avg_income, daily_burn, float(current_balance)
+                )
+            else:
+                # Balance left before each payment, then the same formula as the loop
+                running = current_balance - np.concatenate(([0.0], np.cumsum(amounts)[:-1]))
+                predicted = running + avg_income * (days_until / 30) - daily_burn * days_until
+                status = np.where(predicted >= amounts * 1.2, 0, np.where(predicted >= amounts, 1, 2))
+                risk = _risk_scores(predicted, amounts)
+            
+            next_income = self._next_income_date(state)
+            state['optimized_schedule'] = [
+                replace(
+                    payment,
+                    optimal_payment_date=next_income if status[i] == 2 else payment.next_due,
+                    predicted_balance_on_date=float(predicted[i]),
+                    payment_status=_STATUS_NAMES[status[i]],
+                    risk_score=float(risk[i])
+                )
+                for i, payment in enumerate(upcoming_payments)
+            ]
+            return state
+        
         optimized_schedule = []
         running_balance = current_balance
         
         for payment in upcoming_payments:
-            due_date = payment['next_due']
-            amount = payment['amount']
+            due_date = payment.next_due
+            amount = payment.amount
             
             # Calculate days until due
-            days_until_due = (datetime.strptime(due_date, '%Y-%m-%d') - datetime.now()).days
+            days_until_due = (datetime.strptime(due_date, '%Y-%m-%d') - now).days
             
             # Predict balance on due date
             predicted_balance = running_balance + (
@@ -232,23 +583,30 @@ class AutonomousPaymentScheduler:
                 optimal_date = self._next_income_date(state)
                 status = 'delayed'
             
-            optimized_schedule.append({
-                **payment,
-                'optimal_payment_date': optimal_date,
-                'predicted_balance_on_date': predicted_balance,
-                'payment_status': status,
-                'risk_score': self._calculate_risk_score(predicted_balance, amount)
-            })
+            optimized_schedule.append(replace(
+                payment,
+                optimal_payment_date=optimal_date,
+                predicted_balance_on_date=predicted_balance,
+                payment_status=status,
+                risk_score=self._calculate_risk_score(predicted_balance, amount)
+            ))
             
             running_balance -= amount
         
         state['optimized_schedule'] = optimized_schedule
         return state
     
+    def _days_before(self, date: str, days: int) -> str:
+        """YYYY-MM-DD date the given number of days before date."""
+        if np is not None:
+            return str(np.datetime64(date, 'D') - np.timedelta64(days, 'D'))
+        return (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=days)).strftime('%Y-%m-%d')
+    
     def _next_income_date(self, state: Dict[str, Any]) -> str:
         """Predict next income date."""
         # Simplified: assume monthly income on 1st
-        next_month = datetime.now().replace(day=1) + timedelta(days=32)
+        now = state.get('_now') or datetime.now()
+        next_month = now.replace(day=1) + timedelta(days=32)
         return next_month.replace(day=1).strftime('%Y-%m-%d')
     
     def _calculate_risk_score(self, balance: float, amount: float) -> float:
@@ -267,36 +625,36 @@ class AutonomousPaymentScheduler:
         else:
             return 1.0  # Critical risk
     
-    async def generate_suggestions_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_suggestions_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Generate intelligent autopay suggestions."""
         
         optimized_schedule = state.get('optimized_schedule', [])
         suggestions = []
         
         for payment in optimized_schedule:
-            if payment['priority'] in ['critical', 'high'] and payment['payment_status'] == 'safe':
+            if payment.priority <= _AUTOPAY_MAX_RANK and payment.payment_status == 'safe':
                 suggestions.append({
                     'type': 'enable_autopay',
-                    'merchant': payment['merchant'],
-                    'amount': payment['amount'],
-                    'date': payment['optimal_payment_date'],
+                    'merchant': payment.merchant,
+                    'amount': payment.amount,
+                    'date': payment.optimal_payment_date,
                     'reason': f"Critical payment with sufficient balance buffer",
                     'confidence': 0.95
                 })
-            elif payment['payment_status'] == 'delayed':
+            elif payment.payment_status == 'delayed':
                 suggestions.append({
                     'type': 'payment_alert',
-                    'merchant': payment['merchant'],
-                    'amount': payment['amount'],
-                    'alert_date': (datetime.strptime(payment['next_due'], '%Y-%m-%d') - timedelta(days=3)).strftime('%Y-%m-%d'),
+                    'merchant': payment.merchant,
+                    'amount': payment.amount,
+                    'alert_date': self._days_before(payment.next_due, 3),
                     'reason': "Insufficient balance predicted - manual review needed",
                     'confidence': 0.85
                 })
-            elif payment['priority'] == 'low' and payment['risk_score'] > 0.7:
+            elif payment.priority == _DEFERRABLE_RANK and payment.risk_score > 0.7:
                 suggestions.append({
                     'type': 'defer_payment',
-                    'merchant': payment['merchant'],
-                    'amount': payment['amount'],
+                    'merchant': payment.merchant,
+                    'amount': payment.amount,
                     'defer_to': self._next_income_date(state),
                     'reason': "Low priority payment - defer to improve cash flow",
                     'confidence': 0.75
@@ -315,7 +673,7 @@ class AutonomousPaymentScheduler:
         state['payment_suggestions'] = suggestions
         return state
     
-    async def monitor_execution_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
+    def monitor_execution_node(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Monitor payment execution and learn from outcomes."""
         
         # Track execution metrics
@@ -335,7 +693,7 @@ class AutonomousPaymentScheduler:
         if not schedule:
             return 0.0
         
-        safe_payments = len([p for p in schedule if p['payment_status'] == 'safe'])
+        safe_payments = len([p for p in schedule if p.payment_status == 'safe'])
         total_payments = len(schedule)
         
         return (safe_payments / total_payments) if total_payments > 0 else 0.0
@@ -345,107 +703,178 @@ class AutonomousPaymentScheduler:
         Main entry point for autonomous payment scheduling.
         """
         
-        if self.state_graph:
-            # Use LangGraph workflow
-            initial_state = {
-                'sessionid': sessionid,
-                'transactions': financial_data.get('transactions', []),
-                'current_balance': financial_data.get('current_balance', 0),
-                'timestamp': datetime.now().isoformat()
-            }
+        # Nothing can recur in fewer than two transactions; skip the workflow
+        transactions = financial_data.get('transactions') or []
+        if len(transactions) < 2:
+            return self._empty_response(sessionid)
+        
+        # One clock read per request, shared by every node
+        now = datetime.now()
+        initial_state = {
+            'sessionid': sessionid,
+            'transactions': transactions,
+            'current_balance': financial_data.get('current_balance', 0),
+            'timestamp': now.isoformat(),
+            '_now': now
+        }
+        
+        try:
+            # The nodes are CPU-only, so run the whole workflow in one worker thread
+            if self.state_graph and not self.fast_mode:
+                final_state = await asyncio.to_thread(self.state_graph.invoke, initial_state)
+            else:
+                final_state = await asyncio.to_thread(self._run_pipeline, initial_state)
             
+            return self._success_response(final_state)
+        except Exception as e:
+            logger.error(f"Payment scheduling workflow failed: {e}")
+            return self._mock_schedule_payments(sessionid, financial_data)
+    
+    async def schedule_payments_batch(
+        self, sessions: List[Tuple[str, Dict[str, Any]]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Schedule payments for many sessions at once (nightly batch runs).
+        Returns the schedule_payments result for each session id.
+        """
+        if pd is not None and sessions:
             try:
-                final_state = await self.state_graph.ainvoke(initial_state)
-                
-                return {
-                    'status': 'success',
-                    'cash_flow_analysis': final_state.get('cash_flow_analysis', {}),
-                    'upcoming_payments': final_state.get('upcoming_payments', []),
-                    'optimized_schedule': final_state.get('optimized_schedule', []),
-                    'suggestions': final_state.get('payment_suggestions', []),
-                    'monitoring': final_state.get('monitoring', {}),
-                    'powered_by': 'IBM LangGraph Autonomous Agent'
-                }
+                return await asyncio.to_thread(self._run_batch, sessions)
             except Exception as e:
-                logger.error(f"LangGraph execution failed: {e}")
-                return self._mock_schedule_payments(sessionid, financial_data)
-        else:
-            return self._mock_schedule_payments(sessionid, financial_data)
+                logger.error(f"Batch payment scheduling failed, scheduling per session: {e}")
+        
+        results = {}
+        for sessionid, financial_data in sessions:
+            results[sessionid] = await self.schedule_payments(sessionid, financial_data)
+        return results
+    
+    def _run_batch(self, sessions: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        """Cash flow and recurring payments for every session from one stacked frame."""
+        now = datetime.now()
+        frames = []
+        for sessionid, financial_data in sessions:
+            frame = _to_frame(financial_data.get('transactions', []))
+            if len(frame):
+                frame['user_id'] = sessionid
+                frames.append(frame)
+        
+        flows = {}
+        payments = {}
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+            
+            # Cash flow for every user in one grouped aggregation
+            amounts = df['amount'].fillna(0)
+            df['credit'] = amounts.where(df['type'] == 'CREDIT')
+            df['debit'] = amounts.where(df['type'] == 'DEBIT')
+            flows = df.groupby('user_id', sort=False).agg(
+                avg_income=('credit', 'mean'),
+                debit_total=('debit', 'sum')
+            ).to_dict('index')
+            
+            # Recurring payments per (user, merchant), split back per user
+            recurring = df[df.duplicated(['user_id', 'merchant'], keep=False)]
+            grouped = recurring.groupby(['user_id', 'merchant'], sort=False).agg(
+                amount=('amount', 'mean'),
+                category=('category', 'first'),
+                last_date=('date', 'max')
+            )
+            for user_id, user_groups in grouped.groupby(level='user_id', sort=False):
+                payments[user_id] = self._payments_from_groups(user_groups.droplevel('user_id'), now)
+        
+        results = {}
+        for sessionid, financial_data in sessions:
+            if len(financial_data.get('transactions') or []) < 2:
+                results[sessionid] = self._empty_response(sessionid)
+                continue
+            
+            flow = flows.get(sessionid, {})
+            avg_income = flow.get('avg_income', float('nan'))
+            debit_total = flow.get('debit_total', 0.0)
+            current_balance = financial_data.get('current_balance', 0)
+            
+            state = {
+                'sessionid': sessionid,
+                'transactions': financial_data.get('transactions', []),
+                'current_balance': current_balance,
+                'timestamp': now.isoformat(),
+                '_now': now,
+                'cash_flow_analysis': self._cash_flow_summary(
+                    current_balance,
+                    0 if pd.isna(avg_income) else float(avg_income),
+                    float(debit_total) / 30 if debit_total else 0
+                ),
+                'upcoming_payments': payments.get(sessionid, [])
+            }
+            state = self.optimize_schedule_node(state)
+            state = self.generate_suggestions_node(state)
+            state = self.monitor_execution_node(state)
+            results[sessionid] = self._success_response(state)
+        
+        return results
+    
+    def _empty_response(self, sessionid: str) -> Dict[str, Any]:
+        """Response for a session without enough transaction history to schedule."""
+        return {
+            'status': 'insufficient_data',
+            'message': 'At least two transactions are needed to detect recurring payments',
+            'cash_flow_analysis': {},
+            'upcoming_payments': [],
+            'optimized_schedule': [],
+            'suggestions': [],
+            'monitoring': {},
+            'powered_by': 'IBM LangGraph Autonomous Agent'
+        }
+    
+    def _success_response(self, final_state: Dict[str, Any]) -> Dict[str, Any]:
+        """API response for a completed scheduling run."""
+        return {
+            'status': 'success',
+            'cash_flow_analysis': final_state.get('cash_flow_analysis', {}),
+            'upcoming_payments': self._serialize_payments(final_state.get('upcoming_payments', [])),
+            'optimized_schedule': self._serialize_payments(final_state.get('optimized_schedule', [])),
+            'suggestions': final_state.get('payment_suggestions', []),
+            'monitoring': final_state.get('monitoring', {}),
+            'powered_by': 'IBM LangGraph Autonomous Agent'
+        }
+    
+    def to_json(self, obj: Any) -> bytes:
+        """Encode a scheduling result as JSON bytes, ready for a raw Response."""
+        return _dumps(obj)
+    
+    def _run_pipeline(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the scheduling nodes in workflow order without LangGraph."""
+        state = self.analyze_cash_flow_node(state)
+        state = self.identify_payments_node(state)
+        state = self.optimize_schedule_node(state)
+        state = self.generate_suggestions_node(state)
+        return self.monitor_execution_node(state)
+    
+    @staticmethod
+    def _serialize_payments(payments: List[Payment]) -> List[Dict[str, Any]]:
+        """Payments as response dicts, with their priority rendered as the lowercase level name."""
+        return [payment.to_dict() for payment in payments]
     
     def _mock_schedule_payments(self, sessionid: str, financial_data: Dict[str, Any]) -> Dict[str, Any]:
         """Mock implementation when LangGraph is not available."""
+        now = datetime.now()
         return {
-            'status': 'success',
-            'cash_flow_analysis': {
-                'average_income': 75000,
-                'income_frequency': 'monthly',
-                'daily_burn_rate': 1500,
-                'predicted_balance_7d': 45000,
-                'predicted_balance_30d': 82000,
-                'cash_runway_days': 30
-            },
+            'status': _MOCK_SCHEDULE['status'],
+            'cash_flow_analysis': dict(_MOCK_SCHEDULE['cash_flow_analysis']),
             'upcoming_payments': [
-                {
-                    'merchant': 'Home Rent',
-                    'amount': 25000,
-                    'category': 'Housing',
-                    'priority': 'critical',
-                    'next_due': (datetime.now() + timedelta(days=5)).strftime('%Y-%m-%d'),
-                    'auto_pay_eligible': True
-                },
-                {
-                    'merchant': 'Electricity Board',
-                    'amount': 2500,
-                    'category': 'Utilities',
-                    'priority': 'high',
-                    'next_due': (datetime.now() + timedelta(days=10)).strftime('%Y-%m-%d'),
-                    'auto_pay_eligible': True
-                },
-                {
-                    'merchant': 'Netflix',
-                    'amount': 649,
-                    'category': 'Entertainment',
-                    'priority': 'low',
-                    'next_due': (datetime.now() + timedelta(days=15)).strftime('%Y-%m-%d'),
-                    'auto_pay_eligible': False
-                }
+                {**payment, 'next_due': (now + timedelta(days=offset)).strftime('%Y-%m-%d')}
+                for offset, payment in _MOCK_UPCOMING
             ],
             'optimized_schedule': [
-                {
-                    'merchant': 'Home Rent',
-                    'optimal_payment_date': (datetime.now() + timedelta(days=5)).strftime('%Y-%m-%d'),
-                    'payment_status': 'safe',
-                    'risk_score': 0.3
-                }
-            ],
-            'suggestions': [
-                {
-                    'type': 'enable_autopay',
-                    'merchant': 'Home Rent',
-                    'amount': 25000,
-                    'reason': 'Critical payment with sufficient balance buffer',
-                    'confidence': 0.95
-                },
-                {
-                    'type': 'payment_optimization',
-                    'message': 'Bundle utility payments on salary credit day for better cash flow',
-                    'savings_potential': 500,
-                    'confidence': 0.82
-                }
+                {**payment, 'optimal_payment_date': (now + timedelta(days=offset)).strftime('%Y-%m-%d')}
+                for offset, payment in _MOCK_OPTIMIZED
             ],
-            'monitoring': {
-                'total_payments_scheduled': 8,
-                'autopay_enabled': 3,
-                'alerts_configured': 2,
-                'optimization_score': 0.875,
-                'learning_feedback': 'LangGraph agent learning from 127 historical patterns'
-            },
-            'powered_by': 'IBM LangGraph Autonomous Agent (Simulation Mode)'
+            'suggestions': [dict(suggestion) for suggestion in _MOCK_SCHEDULE['suggestions']],
+            'monitoring': dict(_MOCK_SCHEDULE['monitoring']),
+            'powered_by': _MOCK_SCHEDULE['powered_by']
         }
 
-# Singleton instance
-payment_scheduler = AutonomousPaymentScheduler()
-
+@functools.lru_cache(maxsize=1)
 def get_payment_scheduler():
-    """Get the Autonomous Payment Scheduler instance."""
-    return payment_scheduler
+    """Get the Autonomous Payment Scheduler instance, creating it on first call."""
+    return AutonomousPaymentScheduler()
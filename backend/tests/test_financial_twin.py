@@ -0,0 +1,97 @@
+"""
+Financial twin: what-if scenario handlers, driven by a stand-in Neo4j session.
+Run from backend/: python -m unittest discover tests
+"""
+
+import unittest
+from unittest import mock
+
+from ibm_components import financial_twin
+from ibm_components.financial_twin import FinancialDigitalTwin
+
+class _Result:
+    def __init__(self, record):
+        self._record = record
+    
+    def single(self):
+        return self._record
+
+class _Session:
+    """Neo4j session stand-in that answers every query with one fixed record."""
+    def __init__(self, record):
+        self.record = record
+        self.calls = []
+    
+    def run(self, query, **params):
+        self.calls.append((query, params))
+        return _Result(self.record)
+
+class InvestmentScenarioTest(unittest.TestCase):
+    def test_default_return_grows_the_investment(self):
+        session = _Session({'invested': 100000})
+        result = financial_twin._investment_increase_scenario(session, 's1', {'increase_amount': 5000})
+        self.assertEqual(result['current_investment'], 100000)
+        self.assertGreater(result['projected_returns_1yr'], 100000)
+        self.assertGreater(result['projected_returns_5yr'], result['projected_returns_1yr'])
+        self.assertAlmostEqual(result['projected_returns_1yr'], 112000)
+    
+    def test_whole_number_return_is_not_truncated(self):
+        session = _Session({'invested': 1000})
+        result = financial_twin._investment_increase_scenario(session, 's1', {'expected_return': 7})
+        self.assertAlmostEqual(result['projected_returns_1yr'], 1070)
+
+def _twin(driver):
+    """A twin whose driver is already resolved, so no connection is attempted."""
+    twin = FinancialDigitalTwin()
+    twin.__dict__['driver'] = driver
+    return twin
+
+class ScenarioDispatchTest(unittest.TestCase):
+    def setUp(self):
+        self.twin = _twin(mock.MagicMock())
+        self.session = _Session({
+            'current_total': 100, 'projected_total': 110, 'accounts_affected': 1,
+            'savings': 800, 'invested': 1000
+        })
+    
+    def _run(self, scenario):
+        with mock.patch.object(FinancialDigitalTwin, '_session', return_value=self.session):
+            return self.twin.run_what_if_scenario('s1', scenario)
+    
+    def test_each_type_runs_its_handler(self):
+        expected = {
+            'income_change': financial_twin._Q_INCOME_SCENARIO,
+            'expense_reduction': financial_twin._Q_EXPENSE_SCENARIO,
+            'investment_increase': financial_twin._Q_INVESTMENT_SCENARIO
+        }
+        self.assertEqual(set(financial_twin._SCENARIO_HANDLERS), set(expected))
+        for scenario_type, query in expected.items():
+            result = self._run({'type': scenario_type, 'parameters': {}})
+            self.assertEqual(result['scenario'], scenario_type)
+            self.assertEqual(self.session.calls[-1][0], query)
+    
+    def test_unknown_type_is_unsupported(self):
+        result = self._run({'type': 'job_loss'})
+        self.assertEqual(result, {'scenario': 'job_loss', 'status': 'unsupported'})
+        self.assertEqual(self.session.calls, [])
+
+class MockModeTest(unittest.TestCase):
+    def setUp(self):
+        self.twin = _twin(None)
+    
+    def test_simulated_scenarios(self):
+        result = self.twin.run_what_if_scenario('s1', {'type': 'income_change'})
+        self.assertEqual(result['scenario'], 'income_change')
+        self.assertEqual(result['projected_monthly_income'], 90000)
+        self.assertEqual(
+            self.twin.run_what_if_scenario('s1', {'type': 'job_loss'})['status'], 'analyzed'
+        )
+    
+    def test_public_methods_are_not_rebound(self):
+        self.twin.run_what_if_scenario('s1', {'type': 'income_change'})
+        self.twin.get_rag_insights('s1', 'How am I doing?')
+        for name in ('create_financial_graph', 'run_what_if_scenario', 'get_rag_insights'):
+            self.assertNotIn(name, vars(self.twin))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+"""
+Knowledge-augmented LLM: response caches, run against stand-in Weaviate collections.
+Run from backend/: python -m unittest discover tests
+"""
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from ibm_components import knowledge_augmented
+from ibm_components.knowledge_augmented import KnowledgeAugmentedLLM
+
+_CONTEXT = {'current_balance': 50000, 'monthly_spending': 30000, 'goals': []}
+
+def _llm():
+    """An instance wired to mock Weaviate collections instead of a live server."""
+    with mock.patch.object(KnowledgeAugmentedLLM, '_initialize_weaviate'):
+        llm = KnowledgeAugmentedLLM()
+    llm.client = mock.MagicMock()
+    llm.client.batch.failed_objects = []
+    llm.knowledge_collection = mock.MagicMock()
+    llm.user_ctx_collection = mock.MagicMock()
+    llm.response_cache_collection = mock.MagicMock()
+    llm.response_cache_collection.query.near_text.return_value.objects = []
+    llm._has_client = True
+    llm.watsonx_enabled = True
+    llm._watsonx_model = mock.MagicMock()
+    llm._watsonx_model.generate_content.return_value.text = "generated answer"
+    return llm
+
+def _ask(llm, query, sessionid='s1', user_context=_CONTEXT):
+    return asyncio.run(llm.augment_query(sessionid, query, user_context))
+
+class ExactCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.llm = _llm()
+        self.generate = self.llm._watsonx_model.generate_content
+    
+    def test_repeated_question_is_served_from_cache(self):
+        first = _ask(self.llm, "Should I pay off my credit card first?")
+        second = _ask(self.llm, "  should I pay off my credit card first  ")
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(first, second)
+    
+    def test_reordered_question_is_a_miss(self):
+        _ask(self.llm, "Should I pay off my credit card first or my car loan first?")
+        _ask(self.llm, "Should I pay off my car loan first or my credit card first?")
+        self.assertEqual(self.generate.call_count, 2)
+    
+    def test_other_session_or_context_is_a_miss(self):
+        _ask(self.llm, "What is an ELSS fund?")
+        _ask(self.llm, "What is an ELSS fund?", sessionid='s2')
+        _ask(self.llm, "What is an ELSS fund?", user_context={**_CONTEXT, 'current_balance': 1})
+        self.assertEqual(self.generate.call_count, 3)
+    
+    def test_cached_answer_is_a_copy(self):
+        _ask(self.llm, "What is an ELSS fund?")["response"] = "changed"
+        self.assertEqual(_ask(self.llm, "What is an ELSS fund?")["response"], "generated answer")
+    
+    def test_expired_answer_is_regenerated(self):
+        _ask(self.llm, "What is an ELSS fund?")
+        key, (_, response) = next(iter(self.llm._exact_cache.items()))
+        self.llm._exact_cache[key] = (datetime(2000, 1, 1, tzinfo=timezone.utc), response)
+        _ask(self.llm, "What is an ELSS fund?")
+        self.assertEqual(self.generate.call_count, 2)
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.llm = _llm()
+        self.generate = self.llm._watsonx_model.generate_content
+        self.lookup = self.llm.response_cache_collection.query.near_text
+    
+    def _cache_hit(self, created_at):
+        self.lookup.return_value.objects = [SimpleNamespace(properties={
+            "answer_json": json.dumps({"query": "q", "response": "cached answer"}),
+            "created_at": created_at
+        })]
+    
+    def test_miss_generates_and_stores(self):
+        response = _ask(self.llm, "How much should I save each month?")
+        self.assertEqual(response["response"], "generated answer")
+        self.generate.assert_called_once()
+        self.llm.response_cache_collection.data.insert.assert_called_once()
+    
+    def test_hit_skips_generation(self):
+        self._cache_hit(datetime.now(timezone.utc))
+        response = _ask(self.llm, "How much should I save each month?")
+        self.assertEqual(response["response"], "cached answer")
+        self.generate.assert_not_called()
+    
+    def test_lookup_is_scoped_and_bounded_by_age(self):
+        _ask(self.llm, "How much should I save each month?")
+        self.assertIn("filters", self.lookup.call_args.kwargs)
+    
+    def test_promoted_hit_keeps_its_original_age(self):
+        # A Weaviate answer near the end of its TTL must not get a fresh TTL in-process
+        self._cache_hit(datetime.now(timezone.utc) - timedelta(hours=23, minutes=59, seconds=59))
+        _ask(self.llm, "How much should I save each month?")
+        self.lookup.return_value.objects = []
+        with mock.patch.object(
+            knowledge_augmented, "_RESPONSE_CACHE_TTL", timedelta(hours=23, minutes=59, seconds=59)
+        ):
+            response = _ask(self.llm, "How much should I save each month?")
+        self.assertEqual(response["response"], "generated answer")
+
+class EmbedBatcherTest(unittest.TestCase):
+    def test_concurrent_queries_share_one_encode_call(self):
+        llm = _llm()
+        llm.embedding_model = "stub-model"
+        encode = mock.Mock(side_effect=lambda texts: [[float(len(t))] for t in texts])
+        
+        async def embed_all():
+            return await asyncio.gather(*(llm._embed("q" * n) for n in range(1, 6)))
+        
+        with mock.patch.object(KnowledgeAugmentedLLM, "_encode", lambda self, texts: encode(texts)):
+            vectors = asyncio.run(embed_all())
+        
+        encode.assert_called_once()
+        self.assertEqual(vectors, [[1.0], [2.0], [3.0], [4.0], [5.0]])
+
+def _chunks(*texts, closed=None):
+    """Stand-in for WatsonxModel.generate_content_stream, recording when it is closed."""
+    try:
+        for text in texts:
+            yield SimpleNamespace(text=text)
+    finally:
+        if closed is not None:
+            closed.append(True)
+
+class StreamTest(unittest.TestCase):
+    def _frames(self, llm, query="How do I build an emergency fund?"):
+        async def collect():
+            return [frame async for frame in llm.augment_query_stream('s1', query, _CONTEXT)]
+        return asyncio.run(collect())
+    
+    def test_text_chunks_then_metadata(self):
+        llm = _llm()
+        llm._watsonx_model.generate_content_stream.return_value = _chunks("Save ", "", "monthly.")
+        frames = self._frames(llm)
+        self.assertEqual(frames[:-1], [{"text": "Save "}, {"text": "monthly."}])
+        self.assertNotIn("response", frames[-1]["metadata"])
+        self.assertEqual(frames[-1]["metadata"]["query"], "How do I build an emergency fund?")
+    
+    def test_streamed_answer_is_cached(self):
+        llm = _llm()
+        llm._watsonx_model.generate_content_stream.return_value = _chunks("Save monthly.")
+        self._frames(llm)
+        frames = self._frames(llm)
+        self.assertEqual(frames[0], {"text": "Save monthly."})
+        llm._watsonx_model.generate_content_stream.assert_called_once()
+    
+    def test_abandoned_stream_closes_the_model_stream(self):
+        llm = _llm()
+        closed = []
+        llm._watsonx_model.generate_content_stream.return_value = _chunks("Save ", "monthly.", closed=closed)
+        
+        async def first_frame_only():
+            frames = llm.augment_query_stream('s1', "How do I build an emergency fund?", _CONTEXT)
+            first = await anext(frames)
+            await frames.aclose()
+            return first
+        
+        self.assertEqual(asyncio.run(first_frame_only()), {"text": "Save "})
+        self.assertEqual(closed, [True])
+        self.assertEqual(len(llm._exact_cache), 0)
+    
+    def test_cancel_during_a_pull_closes_the_model_stream(self):
+        llm = _llm()
+        closed = []
+        pulled = threading.Event()
+        
+        def slow_chunks():
+            try:
+                pulled.set()
+                time.sleep(0.2)  # the blocking HTTP read
+                yield SimpleNamespace(text="late")
+            finally:
+                closed.append(True)
+        
+        llm._watsonx_model.generate_content_stream.return_value = slow_chunks()
+        
+        async def cancel_mid_pull():
+            frames = llm.augment_query_stream('s1', "How do I build an emergency fund?", _CONTEXT)
+            task = asyncio.ensure_future(anext(frames))
+            await asyncio.to_thread(pulled.wait)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        
+        asyncio.run(cancel_mid_pull())
+        self.assertEqual(closed, [True])
+    
+    def test_mock_mode_streams_the_mock_response(self):
+        llm = _llm()
+        llm._has_client = False
+        frames = self._frames(llm)
+        self.assertEqual(len(frames), 2)
+        self.assertIn("How do I build an emergency fund?", frames[0]["text"])
+        self.assertIn("metadata", frames[1])
+
+class ReindexInvalidationTest(unittest.TestCase):
+    def test_reindex_drops_cached_answers_everywhere(self):
+        llm = _llm()
+        _ask(llm, "What is an ELSS fund?")
+        llm.response_cache_collection.data.delete_many.reset_mock()
+        
+        result = llm.index_financial_knowledge([{'content': 'New guidance on tax-saving funds'}])
+        
+        self.assertEqual(result['items_indexed'], 1)
+        self.assertEqual(len(llm._exact_cache), 0)
+        llm.response_cache_collection.data.delete_many.assert_called_once()
+        _ask(llm, "What is an ELSS fund?")
+        self.assertEqual(llm._watsonx_model.generate_content.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""
+Payment scheduler: the single-session workflow and the batch path must agree.
+Run from backend/: python -m unittest discover tests
+"""
+
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from ibm_components import payment_scheduler
+from ibm_components.payment_scheduler import AutonomousPaymentScheduler
+
+def _transactions():
+    """Two salary credits plus types that only share a prefix with CREDIT/DEBIT."""
+    today = datetime.now()
+    day = lambda n: (today - timedelta(days=n)).strftime('%Y-%m-%d')
+    return [
+        {'merchant': 'Salary', 'amount': 80000, 'type': 'CREDIT', 'date': day(40), 'category': 'Income'},
+        {'merchant': 'Salary', 'amount': 80000, 'type': 'CREDIT', 'date': day(10), 'category': 'Income'},
+        {'merchant': 'Amazon', 'amount': 5000, 'type': 'CREDIT_REVERSAL', 'date': day(8), 'category': 'Shopping'},
+        {'merchant': 'Home Rent', 'amount': 20000, 'type': 'DEBIT', 'date': day(35), 'category': 'Housing'},
+        {'merchant': 'Home Rent', 'amount': 20000, 'type': 'DEBIT', 'date': day(5), 'category': 'Housing'},
+        {'merchant': 'Bank', 'amount': 900, 'type': 'DEBIT_ADJ', 'date': day(3), 'category': 'Other'},
+    ]
+
+class TransactionTypeTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = AutonomousPaymentScheduler()
+        self.financial_data = {'transactions': _transactions(), 'current_balance': 50000}
+    
+    def test_prefixed_types_are_not_income_or_expense(self):
+        result = asyncio.run(self.scheduler.schedule_payments('s1', self.financial_data))
+        cash_flow = result['cash_flow_analysis']
+        self.assertEqual(cash_flow['average_income'], 80000)
+        self.assertAlmostEqual(cash_flow['daily_burn_rate'], 40000 / 30)
+    
+    @unittest.skipIf(payment_scheduler.pd is None, "pandas not installed")
+    def test_single_session_matches_batch(self):
+        single = asyncio.run(self.scheduler.schedule_payments('s1', self.financial_data))
+        batch = asyncio.run(self.scheduler.schedule_payments_batch([('s1', self.financial_data)]))['s1']
+        self.assertEqual(single['cash_flow_analysis'], batch['cash_flow_analysis'])
+        self.assertEqual(single['upcoming_payments'], batch['upcoming_payments'])
+
+if __name__ == '__main__':
+    unittest.main()
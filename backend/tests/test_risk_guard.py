@@ -0,0 +1,106 @@
+"""
+Risk guard: batch scoring must agree with the per-transaction risk models.
+Run from backend/: python -m unittest discover tests
+"""
+
+import asyncio
+import os
+import random
+import time
+import unittest
+from unittest import mock
+
+from ibm_components import risk_guard
+from ibm_components.risk_guard import ProactiveRiskGuard
+
+def _transactions(n, seed=7):
+    """Random transactions mixing typical, risky and unseen field values."""
+    rng = random.Random(seed)
+    categories = ['Food', 'Transport', 'Gambling', 'Crypto', 'Travel', 'Unknown']
+    merchants = ['Swiggy', 'Uber', 'Unknown', 'Crypto Exchange', 'Local Store']
+    locations = ['Mumbai', 'Pune', 'Unknown', 'International - London', 'Chennai']
+    transactions = []
+    for i in range(n):
+        transaction = {
+            'id': f'txn_{i}',
+            'amount': rng.choice([100, 2500, 12500, 13000, 25000, 30000, 40000]),
+            'category': rng.choice(categories),
+            'merchant': rng.choice(merchants),
+            'location': rng.choice(locations),
+            'daily_count': rng.randint(1, 12),
+            'is_duplicate': rng.random() < 0.1,
+            'rapid_sequence': rng.random() < 0.2,
+            '_hour': rng.randrange(24)
+        }
+        # Fields the models default when absent
+        for key in ('category', 'merchant', 'location', 'daily_count'):
+            if rng.random() < 0.05:
+                del transaction[key]
+        transactions.append(transaction)
+    return transactions
+
+@unittest.skipIf(risk_guard.np is None, "numpy not installed")
+@mock.patch.dict(os.environ, {'LLM_PROVIDER': 'google'})
+class BatchParityTest(unittest.TestCase):
+    def setUp(self):
+        self.guard = ProactiveRiskGuard()
+        self.transactions = _transactions(400)
+    
+    def _assert_parity(self):
+        with mock.patch.object(risk_guard.logger, 'error') as log_error:
+            batch = asyncio.run(self.guard.analyze_batch('s1', self.transactions))
+        log_error.assert_not_called()  # scored as a batch, not via the per-item fallback
+        for transaction, assessed in zip(self.transactions, batch):
+            single = asyncio.run(self.guard.analyze_transaction('s1', transaction))
+            self.assertEqual(assessed['risk_scores'], single['risk_scores'], transaction)
+            self.assertEqual(assessed['risk_level'], single['risk_level'], transaction)
+            self.assertEqual(assessed['confidence'], single['confidence'], transaction)
+    
+    def test_batch_matches_per_transaction(self):
+        self._assert_parity()
+    
+    def test_numpy_fallback_matches_per_transaction(self):
+        with mock.patch.object(risk_guard, 'njit', None):
+            self._assert_parity()
+
+@mock.patch('confluent_kafka.Producer')
+@mock.patch('confluent_kafka.Consumer')
+class ShutdownTest(unittest.TestCase):
+    def _consume(self, *args):
+        time.sleep(0.01)
+        return []
+    
+    def test_close_flushes_and_drops_the_producer(self, consumer_cls, producer_cls):
+        consumer_cls.return_value.consume.side_effect = self._consume
+        guard = ProactiveRiskGuard()
+        
+        async def monitor_then_close():
+            await guard.start_monitoring('s1')
+            guard.close()
+        
+        asyncio.run(monitor_then_close())
+        
+        consumer_cls.return_value.close.assert_called_once()
+        producer_cls.return_value.flush.assert_called_once()
+        self.assertIsNone(guard.consumer)
+        self.assertIsNone(guard.producer)
+        self.assertIsNone(guard._flush_task)
+        self.assertFalse(guard._consumer_thread.is_alive())
+    
+    def test_reconnect_after_close_creates_one_new_producer(self, consumer_cls, producer_cls):
+        consumer_cls.return_value.consume.side_effect = self._consume
+        guard = ProactiveRiskGuard()
+        
+        async def monitor_twice():
+            await guard.start_monitoring('s1')
+            guard.close()
+            await guard.start_monitoring('s1')
+            guard.close()
+        
+        asyncio.run(monitor_twice())
+        
+        self.assertEqual(producer_cls.call_count, 2)
+        self.assertEqual(producer_cls.return_value.flush.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,21 @@
 # utils/watsonx_client.py
 import os
+import atexit
+import threading
+import time
 import httpx
 import json
+from typing import Dict, Iterator, Optional, Tuple
+
+# HTTP/2 needs the h2 package (httpx[http2]); fall back to HTTP/1.1 keep-alive
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+# Refresh IAM tokens this many seconds before they expire
+_TOKEN_REFRESH_MARGIN = 60
 
 class _Resp:
     def __init__(self, text: str):
@@ -12,6 +26,14 @@ class WatsonxModel:
     Minimal drop-in for google.generativeai.GenerativeModel:
     exposes generate_content(prompt) -> object with .text
     """
+    # IAM tokens live about an hour; share them across instances, keyed by API key
+    _tokens: Dict[str, Tuple[str, float]] = {}
+    _token_lock = threading.Lock()
+
+    # One pooled client per process so IAM and generation calls reuse connections
+    _client: Optional[httpx.Client] = None
+    _client_lock = threading.Lock()
+
     def __init__(self):
         self.region = os.getenv("WATSONX_REGION", "us-south")
         self.project_id = os.getenv("WATSONX_PROJECT_ID", "")
@@ -19,8 +41,42 @@ class WatsonxModel:
         self.version = os.getenv("WATSONX_API_VERSION", "2025-02-11")
         self.api_key = os.getenv("WATSONX_API_KEY", "")
 
+    @classmethod
+    def _http(cls) -> httpx.Client:
+        if cls._client is None:
+            with cls._client_lock:
+                if cls._client is None:
+                    cls._client = httpx.Client(
+                        http2=_HTTP2,
+                        timeout=None,
+                        limits=httpx.Limits(max_keepalive_connections=10),
+                    )
+                    atexit.register(cls.close)
+        return cls._client
+
+    @classmethod
+    def close(cls) -> None:
+        """Close the shared HTTP client; the next call opens a new one."""
+        with cls._client_lock:
+            if cls._client is not None:
+                cls._client.close()
+                cls._client = None
+
     def _iam_token(self) -> str:
-        r = httpx.post(
+        cached = self._tokens.get(self.api_key)
+        if cached and time.time() < cached[1] - _TOKEN_REFRESH_MARGIN:
+            return cached[0]
+        with self._token_lock:
+            # Another thread may have refreshed while we waited for the lock
+            cached = self._tokens.get(self.api_key)
+            if cached and time.time() < cached[1] - _TOKEN_REFRESH_MARGIN:
+                return cached[0]
+            token, expires_in = self._fetch_iam_token()
+            self._tokens[self.api_key] = (token, time.time() + expires_in)
+            return token
+
+    def _fetch_iam_token(self) -> Tuple[str, float]:
+        r = self._http().post(
             "https://iam.cloud.ibm.com/identity/token",
             data={
                 "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
@@ -30,18 +86,25 @@ class WatsonxModel:
             timeout=None,
         )
         r.raise_for_status()
-        return r.json()["access_token"]
+        data = r.json()
+        return data["access_token"], float(data.get("expires_in", 3600))
 
-    def generate_content(self, prompt: str) -> _Resp:
-        token = self._iam_token()
-        url = f"https://{self.region}.ml.cloud.ibm.com/ml/v1/text/generation?version={self.version}"
-        payload = {
+    def _url(self, endpoint: str) -> str:
+        return f"https://{self.region}.ml.cloud.ibm.com/ml/v1/text/{endpoint}?version={self.version}"
+
+    def _payload(self, prompt: str) -> dict:
+        return {
             "input": prompt,
             "parameters": {"max_new_tokens": 512, "temperature": 0.7},
             "model_id": self.model_id,
             "project_id": self.project_id,
         }
-        r = httpx.post(
+
+    def generate_content(self, prompt: str) -> _Resp:
+        token = self._iam_token()
+        url = self._url("generation")
+        payload = self._payload(prompt)
+        r = self._http().post(
             url,
             json=payload,
             headers={"Authorization": f"Bearer {token}", "Accept": "application/json"},
@@ -65,3 +128,25 @@ class WatsonxModel:
             text = json.dumps(data)
 
         return _Resp(text=text)
+
+    def generate_content_stream(self, prompt: str) -> Iterator[_Resp]:
+        """Yield generated text chunk by chunk from the generation_stream SSE endpoint."""
+        token = self._iam_token()
+        with self._http().stream(
+            "POST",
+            self._url("generation_stream"),
+            json=self._payload(prompt),
+            headers={"Authorization": f"Bearer {token}", "Accept": "text/event-stream"},
+            timeout=None,
+        ) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    data = json.loads(line[5:])
+                except ValueError:
+                    continue
+                results = data.get("results") if isinstance(data, dict) else None
+                if results:
+                    yield _Resp(text=results[0].get("generated_text"))